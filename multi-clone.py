@@ -23,9 +23,11 @@ Throughout, maintain a list of entries with success/fail status
         'datetime': <datetime>
         'first': <firstname>,
         'last': <lastname>,
+        'key': <first last, casefolded, the key in the dictionary of students>,
         'userid': <github user ID>,
         'repo': <reponame>,
         'status': <one of success, no_repo, no_html, github, cloned, problem, others TBD>
+        'stderr': <git error output, only when status is problem>
     }
 
 ToDo: guard against broken URLs like *.git.git
@@ -36,8 +38,9 @@ from sys import argv, stderr
 import re  # Regular expressions to dig through folder names
 import pathlib  # file & folder path objects
 import os
-from datetime import datetime  # The strptime() method to convert strings to date-time
+from datetime import datetime  # date-time stamps of the submissions
 import subprocess  # for the git clone task
+from concurrent.futures import ThreadPoolExecutor, as_completed  # parallel clones
 
 # Constants
 # OpenSSH, to use different entry in .ssh/config
@@ -48,6 +51,26 @@ server_name = "git@github-fleming"  # Different from my usual GitHub ID for SSH
     # Host github-fleming
     #     Hostname github.com
     #     IdentityFile C:/Users/Louis/.ssh/id_ed25519-win11-fleming
+max_clones = 16  # Maximum number of git clone processes running at the same time
+max_scans = 16  # Maximum number of submission folders scanned at the same time
+# Shallow clone: grading only needs the latest commit, not the whole history.
+# Set to () to get the full history.
+clone_options = ("--depth=1", "--single-branch")
+
+# Month abbreviations in the D2L folder names
+months = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+          'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+
+# Regular expressions, compiled once here instead of on every call.
+# Folder name produced by the D2L downloader:
+#     NNNNN-MMMMMM - First Last - MON DD, 2025 HHMM PM
+# Last name is '.' or [\w-]+ (covers hyphenated names), no overlapping branches to backtrack over.
+FOLDER_RE = re.compile(r'\d+-\d+ - (\w+) (\.|[\w-]+) - (\w{3}) (\d{1,2}), (\d{4}) (\d{3,4}) (AM|PM)')
+# Pattern to match <a> tag hyperlink or <p> tag plain text paste.
+# Both alternatives share the one capture group for the URL: https://github.com/userid/repo...
+URL_RE = re.compile(r'(?:href="|<p>)(https://github\.com/[^"<\s/]+/[^"<\s]+?)(?:"|</p>)')
+# Any number of extraneous ".git" name extensions on the repo name, like *.git.git
+GIT_SUFFIXES_RE = re.compile(r'(?:\.git)+$')
 
 
 def get_folder(argv):
@@ -61,46 +84,48 @@ def get_folder(argv):
     return folder.resolve(strict=True)
 
 def list_folders(folder):
-    '''Return a list of folders as pathlib.Path objects.
+    '''Return a list of folders as (name, path) string tuples.
     Parameter folder is a Path containing the target folders.
     '''
-    folders = []
-    for entry in folder.iterdir():
-        path = pathlib.Path(entry)
-        if path.is_dir():
-            folders.append(path)
-    return folders
+    # os.scandir() gets the entry type along with the name, no extra stat() per entry.
+    with os.scandir(folder) as entries:
+        return [(entry.name, entry.path) for entry in entries if entry.is_dir(follow_symlinks=False)]
 
 def get_datetime(grps):
     '''The groups returned by the regex are:
         MON DD YYYY HHMM AM
         HHMM could also be HMM, hence the divide by 100 and modulo 100,
-        AM could be PM; this is where strptime() very convenient
-        (so D2L doesn't know about 24-hour time?).
+        AM could be PM (so D2L doesn't know about 24-hour time?).
+        12 AM is midnight (hour 0) and 12 PM is noon (hour 12).
+    Built directly instead of with strptime(), which parses its format string on every call.
     return a datetime instance.
     '''
     hh = int(grps[5])//100
     mm = int(grps[5])%100
-    timestamp = datetime.strptime(f'{grps[2]} {grps[3]} {grps[4]} {hh} {mm} {grps[6]}', r'%b %d %Y %I %M %p')
+    hour = hh % 12 + (12 if grps[6] == 'PM' else 0)
+    timestamp = datetime(int(grps[4]), months[grps[2]], int(grps[3]), hour, mm)
     return timestamp
 
-def extract_student_info(path):
+def extract_student_info(folder_name, path):
     '''Using a regex, break up the folder name produced by the D2L downloader into groups.
         NNNNN-MMMMMM - First Last - MON DD, 2025 HHMM PM
+    Parameter folder_name is the last component of path, the actual folder name.
     return a dictionary of student information, or None if the regex did not match anything.
     '''
-    # Extract the last component of the path, the actual folder name.
-    folder_name = path.name
-    pattern = r'\d+-\d+\s-\s(\w+) (\.|\w+|\w+-\w+)\s-\s(\w+)\s(\d+),\s(\d{4})\s(\d{3,4})\s(AM|PM)$'
-    mat = re.search(pattern, folder_name)
+    # Cheap checks first: skip anything that can't be a D2L folder without running the regex.
+    if not folder_name or not folder_name[0].isdigit() or ' - ' not in folder_name:
+        return None
+    mat = FOLDER_RE.fullmatch(folder_name)  # the whole name must match
     if mat:
         grps = mat.groups()
         timestamp = get_datetime(grps)
         student = {
-            'folder': path,
+            'folder': pathlib.Path(path),  # only matching folders become Path objects
             'datetime': timestamp,
             'first': grps[0],
             'last': grps[1],
+            # computed once, used to find duplicates; the space keeps "Ann Marie" apart from "An Nmarie"
+            'key': f'{grps[0]} {grps[1]}'.casefold(),
         # the next two will be added later, from the HTML file in the folder.
         #     'userid': <github user ID>,
         #     'repo': <reponame>,
@@ -116,90 +141,119 @@ def get_github_info(students):
     the comment that should give the URL to the repo on GitHub.
     Adds user ID and repo name to the student's dictionary,
     then forms the proper URL to clone using ssh (instead of https).
+    The folders are independent, so they are scanned in a pool of threads;
+    each thread only touches its own student's dictionary, no lock needed.
     returns None
     '''
-    for student in students.values():
-        if not student['status'] == "folder":
-            continue
-        folder = student['folder']
-        # print(f"folder={folder}")  # Debug only
-        # Get the .html file(s)
-        for name in folder.glob('*.html'):
-            get_student_url(student, name)
+    to_scan = [student for student in students.values() if student['status'] == "folder"]
+    if not to_scan:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_scans, len(to_scan))) as executor:
+        # list() waits for every scan and re-raises anything unexpected from the threads
+        list(executor.map(scan_folder, to_scan))
+    return
+
+def scan_folder(student):
+    '''Find the .html file in the student's folder and get the GitHub URL from it.
+    returns None
+    '''
+    folder = student['folder']
+    # print(f"folder={folder}")  # Debug only
+    # Get the .html file(s): D2L puts one in each submission folder,
+    # but the student may have handed in HTML files of their own.
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith('.html') and entry.is_file(follow_symlinks=False):
+                get_student_url(student, entry.path)
+                if student['status'] == 'github':
+                    break  # found the URL, no need to read the other files
     return
 
 def get_student_url(student, name):
-    # Pattern to match <a> tag hyperlink or <p> tag plain text paste.
-    #  https://regex101.com/r/8Z43u4/1
-    PATTERN = r'href=(?:\")(https\://github\.com/.+/.+)(?:\")|(?:<p>)(https://github.com/.+/.+)(?:</p>)'
+    '''Search the .html file for the URL to the student's GitHub repo.
+    The file is small, so read it all at once and search it in one pass.
+    '''
     with open(name, 'r', encoding='utf-8') as html:
-        for line in html:
-            mat = re.search(PATTERN, line)
-            if mat:
-                # The URL could be in one of the groups, which one?
-                for grp in mat.groups():
-                    if 0 == str(grp).find(r"https://github.com"):
-                        url = str(grp)
-                        break
-                # print(url, file=stderr)  # Debug only
-                components = url.split('/')  # split along / separator
-                # print(f"Components = {components}", file=stderr)   # Debug only
-                student['userid'] = components[3]
-                # remove any extraneous ".git" name extensions
-                repo = components[4]
-                # print(f"repo = {repo}", file=stderr)  # Debug only
-                while re.search(r"\.git$", repo):
-                    repo = re.sub(r"\.git$", "", repo)
-                    # print(f"trimmed = {repo}", file=stderr)  # Debug only
-                student['repo'] = repo
-                # print(f"student.repo = {student['repo']}", file=stderr)  # Debug only
-
-                # Form the SSH URL
-                # Example: git clone git@github-fleming:CSIkid/COMP593-lab2.git
-                student['ssh_url'] = f"{server_name}:{components[3]}/{repo}.git"
-                # print(f"student.ssh_url = {student['ssh_url']}", file=stderr)  # Debug only
-                student['status'] = 'github'  # Means that we have the GitHub info.
-                return
-            else:
-                student['ssh_url'] = ""
-                student['status'] = 'no_url'
+        content = html.read()
+    # Cheap substring check first, only run the regex if there is a GitHub URL at all.
+    mat = URL_RE.search(content) if 'https://github.com/' in content else None
+    if not mat:
+        student['ssh_url'] = ""
+        student['status'] = 'no_url'
+        return
+    url = mat.group(1)
+    # print(url, file=stderr)  # Debug only
+    # https://github.com/userid/repo/... -- stop splitting after the repo name
+    components = url.split('/', 4)
+    # print(f"Components = {components}", file=stderr)   # Debug only
+    userid = components[3]
+    # drop anything after the repo name: sub-path, query or fragment
+    repo = components[4].split('/', 1)[0].split('?', 1)[0].split('#', 1)[0]
+    # remove any extraneous ".git" name extensions, all of them in one pass
+    repo = GIT_SUFFIXES_RE.sub('', repo)
+    # print(f"repo = {repo}", file=stderr)  # Debug only
+
+    # Form the SSH URL, then record everything in one go.
+    # Example: git clone git@github-fleming:CSIkid/COMP593-lab2.git
+    student.update(userid=userid,
+                   repo=repo,
+                   ssh_url=f"{server_name}:{userid}/{repo}.git",
+                   status='github')  # Means that we have the GitHub info.
+    # print(f"student.ssh_url = {student['ssh_url']}", file=stderr)  # Debug only
+    return
+
+def clone_one(student):
+    '''Run git clone for one student, in the student's folder.
+    Records the outcome in the student's dictionary: cloned or problem,
+    plus the stderr output from git in case of trouble.
+    returns None
+    '''
+    # git -C changes to the student's folder itself, no cwd needed for the subprocess.
+    command = ("git", "-C", str(student['folder']), "clone", *clone_options, student['ssh_url'])
+    # print(command, file=stderr)  # Debug only
+    try:
+        # git writes its progress to stderr and nothing useful to stdout, so drop stdout
+        # and keep only stderr for the error report.
+        with subprocess.Popen(command,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE,
+                              text=True) as proc:
+            _, errors = proc.communicate()
+        # print(f'return={proc.returncode}')
+        if proc.returncode == 0:
+            student['status'] = 'cloned'
+        else:
+            student['status'] = 'problem'
+            student['stderr'] = errors
+    except OSError as err:
+        student['status'] = 'problem'
+        student['stderr'] = f"{command}: {err}"
+    return
 
 def clone_repos(students):
-    '''Spawn a new task for each to git clone the student repo.'''
-    for k in students.keys():
-        student = students[k]
+    '''Spawn a new task for each to git clone the student repo.
+    The clones are network-bound, so they run in a pool of threads.
+    Each thread only touches its own student's dictionary, no lock needed.
+    '''
+    to_clone = {}
+    for k, student in students.items():
         if student['status'] != 'github':
             print(f"multi-clone: error: No GitHub URL found for student {k}.")
             continue
-        command = ("git", "clone", student['ssh_url'])
-        # print(command, file=stderr)  # Debug only
-        try:
-            completed = subprocess.run( command,
-                               stdin=None,
-                               input=None,
-                               stdout=None,
-                               stderr=None,
-                               capture_output=True,
-                               shell=False,
-                               cwd=student['folder'],
-                               timeout=None,
-                               check=False,
-                               encoding=None,
-                               errors=None,
-                               text=True,
-                               env=None,
-                               universal_newlines=None
-                            )
-            # print(f'{k}: return={completed.returncode}')
-            if completed.returncode == 0:
-                student['status'] = 'cloned'
-            else:
-                student['status'] = 'problem'
-                print(f'  stderr="{completed.stderr}"', file=stderr)
-        except subprocess.CalledProcessError as err:
-            student['status'] = 'problem'
-            print(f"Subprocess failed for student {student['first']} {student['last']}\n"
-                  f"{err.cmd}: {err.output}", file=stderr)
+        to_clone[k] = student
+    if not to_clone:
+        return
+    # Cap the number of simultaneous clones so GitHub doesn't throttle the SSH connections.
+    with ThreadPoolExecutor(max_workers=min(max_clones, len(to_clone))) as executor:
+        futures = {executor.submit(clone_one, student): k for k, student in to_clone.items()}
+        for future in as_completed(futures):
+            k = futures[future]
+            student = to_clone[k]
+            future.result()  # re-raise anything unexpected from the thread
+            # Only report failures here, main() prints every student's status at the end.
+            # Clones finish in any order, so name the student.
+            if student['status'] == 'problem':
+                print(f'{k}:\n  stderr="{student["stderr"]}"', file=stderr)
     return  # return nothing, everything is in the dictionary
 
 def main():
@@ -211,27 +265,24 @@ def main():
     print(f'[{datetime.now().isoformat()}] multi-clone.py: Processing {main_folder}')
     folders = list_folders(main_folder)
     students = {}
-    for f in folders:
-        student = extract_student_info(f)
+    for name, path in folders:
+        student = extract_student_info(name, path)
         # Add the student dictionary to the dictionary of students,
-        # using first+last as the key.
+        # using "first last" as the key.
         # Check datetime to make sure that we are using the most recent submission
         if student:
-            student_key = student['first'].lower() + student['last'].lower()
+            student_key = student['key']
             # If student already in students, check datetime to keep latest
-            if student_key in students:
-                prev_datetime = students[student_key]['datetime']
-                if student['datetime'] > prev_datetime:
-                    del students[student_key]
-            students[student_key] = student
+            existing = students.get(student_key)
+            if existing is None or student['datetime'] > existing['datetime']:
+                students[student_key] = student
 
     # print(f'students=\n{students}\n', file=stderr)
     get_github_info(students)  # Add GitHub info to each dictionary
     # spawn a new task for each, recording the outcome in the dictionary.
     clone_repos(students)
     # Report the outcome
-    for k in students.keys():
-        student = students[k]
+    for k, student in students.items():
         print(f"{k}: {student['status']}")
     return 0
 
@@ -13,6 +13,10 @@ The output can be described as follows:
 '''
 import re
 
+# Compile the patterns once, instead of on every call.
+BRACKETS_RE = re.compile(r'(\(\d{3}\))\s?(\d{3})-(\d{4}$)')
+DASHES_RE = re.compile(r'(?:^1-)?(\d{3})-(\d{3})-(\d{4}$)')
+
 def phone_number_brackets(candidate):
     '''Attempt to recognize a phone number with area code in brackets.
     Example: (705)555-1212
@@ -21,8 +25,7 @@ def phone_number_brackets(candidate):
     See this regex on Regex101.com:
         https://regex101.com/r/qw559F/1
     '''
-    patt = r'(\(\d{3}\))\s?(\d{3})-(\d{4}$)'
-    mat = re.search(patt, candidate)
+    mat = BRACKETS_RE.search(candidate)
     if mat:
         area = mat.group(1).strip('()')
         return f'+1.{area}.{mat.group(2)}.{mat.group(3)}'
@@ -37,8 +40,7 @@ def phone_number_dashes(candidate):
     See this regex on Regex101.com:
         https://regex101.com/r/qw559F/1
     '''
-    patt = r'(?:^1-)?(\d{3})-(\d{3})-(\d{4}$)'
-    mat = re.search(patt, candidate)
+    mat = DASHES_RE.search(candidate)
     if mat:
         return f'+1.{mat.group(1)}.{mat.group(2)}.{mat.group(3)}'
     else:
@@ -47,8 +49,8 @@ def phone_number_dashes(candidate):
 def main():
     with open("phone-numbers.txt", "r") as infile:
         counter = 0
-        for line in infile.readlines():
-            line = line.strip()  # Remove trailine newline
+        for line in infile:  # read one line at a time, no list of all lines
+            line = line.rstrip('\n')  # Remove trailing newline
             print(counter, line, end=' ')
             counter += 1
             bracketed = phone_number_brackets(line)
@@ -1,14 +1,16 @@
 # COMP 593 Week 4 regex example slides 38-41
 # Extract names and phone numbers from a text file
 import re
+# Compile the pattern once, before the search
+# PHONE=(\S+) also catches the last record if the file doesn't end with whitespace
+pattern = re.compile(r'NAME=(\S+)[ \t].*?PHONE=(\S+)')
 with open(r'muppets.txt', 'r') as file:
-    pattern = r'NAME=(.*?)\s.*?PHONE=(.*?)\s'
-    # Iterate through file line by line
-    for line in file:
-        # Check line for regex match
-        match = re.search(pattern, line)
-        if match:
-            # Extract and print capturing group info
-            name = match.group(1)
-            phone = match.group(2)
-            print(f"{name}'s phone number is {phone}.")
+    # Read the whole file at once, it's small
+    data = file.read()
+# Iterate through every match in the file, one pass
+# ([ \t] and . do not match a newline, so each match stays on one line)
+for match in pattern.finditer(data):
+    # Extract and print capturing group info
+    name = match.group(1)
+    phone = match.group(2)
+    print(f"{name}'s phone number is {phone}.")